@@ -6,21 +6,43 @@ Mapea automáticamente las columnas del template a las del Excel.
 Permite ajustar el mapeo manualmente antes de generar.
 """
 
+import csv
+import datetime
+import glob
+import hashlib
+import html
+import io
+import json
+import multiprocessing
+import os
 import sys
 import re
+import tempfile
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from decimal import Decimal, ROUND_HALF_UP, localcontext
+from functools import lru_cache
 import unicodedata
+from xml.sax.saxutils import escape
 import tkinter as tk
 from tkinter import filedialog, messagebox, scrolledtext, ttk
 from pathlib import Path
 
 from openpyxl import load_workbook
+from openpyxl.styles.numbers import is_date_format
 from openpyxl.utils import get_column_letter, column_index_from_string
+from openpyxl.utils.datetime import from_excel
 from docx import Document
-from docx.shared import Pt
+from docx.shared import Emu, Pt
 from docx.enum.text import WD_ALIGN_PARAGRAPH
-from docx.enum.section import WD_ORIENT
+from docx.enum.section import WD_ORIENT, WD_SECTION
 from docx.oxml.ns import qn, nsdecls
 from docx.oxml import parse_xml
+from reportlab.lib import colors
+from reportlab.lib.utils import simpleSplit
+from reportlab.pdfgen import canvas as pdf_canvas
 
 
 # ---------------------------------------------------------------------------
@@ -63,6 +85,10 @@ ALIGN_MAP = {
 
 SPECIAL_SOURCES = ["(auto-incremento)", "(extraer país)"]
 
+# Separators Excel displays formatted numbers with (Spanish locale)
+THOUSANDS_SEP = "."
+DECIMAL_SEP = ","
+
 
 def base_dir() -> Path:
     if getattr(sys, "frozen", False):
@@ -188,6 +214,301 @@ def read_template(template_path: str) -> dict:
     }
 
 
+# ---------------------------------------------------------------------------
+# Excel number / date formats
+# ---------------------------------------------------------------------------
+
+MONTH_NAMES = [name.lower() for name in MONTH_MAP]
+MONTH_ABBRS = list(MONTH_MAP.values())
+DAY_NAMES = ["lunes", "martes", "miércoles", "jueves", "viernes", "sábado", "domingo"]
+ELAPSED_TOKENS = {"[h]", "[hh]", "[m]", "[mm]", "[s]", "[ss]"}
+# Day zero of Excel's 1900 date system, as openpyxl's from_excel uses it
+EXCEL_EPOCH = datetime.datetime(1899, 12, 30)
+
+NUMBER_TOKEN_RE = re.compile(r'"[^"]*"|\\.|_.|\*.|\[[^\]]*\]|.')
+DATE_TOKEN_RE = re.compile(
+    r'"[^"]*"|\\.|_.|\*.|\[[^\]]*\]|yyyy|yy|mmmmm|mmmm|mmm|mm|m|dddd|ddd|dd|d|hh|h|ss|s|am/pm|a/p|.',
+    re.IGNORECASE,
+)
+
+
+def _split_sections(number_format: str) -> list[str]:
+    """Split a format on ';' outside quoted literals, keeping empty sections."""
+    sections = [""]
+    for tok in re.findall(r'"[^"]*"|\\.|.', number_format):
+        if tok == ";":
+            sections.append("")
+        else:
+            sections[-1] += tok
+    return sections
+
+
+def _format_general(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        if value.is_integer():
+            return str(int(value))
+        # Excel's General format shows up to 10 significant digits
+        return f"{value:.10g}".replace(".", DECIMAL_SEP)
+    return str(value)
+
+
+def _compile_number_section(section: str):
+    """Compile one section of a number format, or None if it can't be shown faithfully."""
+    if not section:
+        # An empty section hides the value (e.g. the zero section of 0;-0;;@)
+        return lambda value: ""
+    items, percent = [], 0  # (is_placeholder, token or literal text)
+    for tok in NUMBER_TOKEN_RE.findall(section):
+        if tok in ("0", "#", "?", ".", ","):
+            items.append((True, tok))
+            continue
+        if tok[0] == '"':
+            lit = tok[1:-1]
+        elif tok[0] == "\\":
+            lit = tok[1]
+        elif tok[0] == "_":
+            lit = " "
+        elif tok.startswith("[$"):
+            # [$US$-409]: currency symbol followed by a locale id
+            lit = tok[2:-1].split("-")[0]
+        elif tok[0] in "*[":
+            continue
+        else:
+            percent += tok == "%"
+            lit = tok
+        items.append((False, lit))
+
+    marks = [i for i, (is_placeholder, _) in enumerate(items) if is_placeholder] or [len(items)]
+    first, last = marks[0], marks[-1]
+    prefix = [lit for _, lit in items[:first]]
+    suffix = [lit for _, lit in items[last + 1:]]
+    pattern = [tok for is_placeholder, tok in items[first:last + 1] if is_placeholder]
+    # Literals between integer digits (000-000) stay where they are, counted
+    # by the digit placeholders to their right
+    inner = []
+    for i in range(first, last + 1):
+        is_placeholder, tok = items[i]
+        if is_placeholder:
+            continue
+        left = [t for p, t in items[first:i] if p]
+        right = [t for p, t in items[i + 1:last + 1] if p]
+        if "." in left or "," in pattern:
+            return None
+        int_right = right[:right.index(".")] if "." in right else right
+        inner.append((sum(t in "0#?" for t in int_right), tok))
+
+    int_part, _, dec_part = "".join(pattern).partition(".")
+    digits = int_part.rstrip(",")
+    # Trailing commas scale the value down by thousands
+    scale = len(dec_part) - len(dec_part.rstrip(",")) if dec_part else len(int_part) - len(digits)
+    dec_part = dec_part.rstrip(",")
+    thousands = "," in digits
+    min_int = digits.count("0")
+    min_dec = dec_part.count("0")
+    max_dec = len(dec_part.replace(",", ""))
+    prefix, suffix = "".join(prefix), "".join(suffix)
+    factor = Decimal(100) ** percent / Decimal(1000) ** scale
+
+    def fmt(value) -> str:
+        # Round half up on the decimal digits shown, like Excel (2.675 -> 2,68)
+        number = Decimal(repr(value)) if isinstance(value, float) else Decimal(value)
+        with localcontext() as ctx:
+            # Enough digits for every integer and decimal place shown (floats reach 1e308)
+            ctx.prec = max(ctx.prec, number.adjusted() + max_dec + 8)
+            number = (number * factor).quantize(Decimal(1).scaleb(-max_dec), rounding=ROUND_HALF_UP)
+        text = f"{number:{',' if thousands else ''}.{max_dec}f}"
+        int_s, _, dec_s = text.partition(".")
+        while len(dec_s) > min_dec and dec_s.endswith("0"):
+            dec_s = dec_s[:-1]
+        if not thousands:
+            int_s = int_s.zfill(min_int)
+        if int_s == "0" and min_int == 0:
+            int_s = ""
+        int_s = int_s.replace(",", THOUSANDS_SEP)
+        if inner:
+            pieces, start = [], 0
+            for right, lit in inner:
+                cut = max(start, len(int_s) - right)
+                pieces += [int_s[start:cut], lit]
+                start = cut
+            int_s = "".join(pieces) + int_s[start:]
+        return f"{prefix}{int_s}{DECIMAL_SEP + dec_s if dec_s else ''}{suffix}"
+
+    return fmt
+
+
+def _date_unit(token: str) -> str:
+    """y/m/d/h/s for date and time tokens (elapsed [h] counts as h), else ""."""
+    if token in ELAPSED_TOKENS:
+        token = token[1:-1]
+    return token[:1] if token[:1] in ("y", "m", "d", "h", "s") else ""
+
+
+def _elapsed_seconds(value):
+    """Duration in whole seconds for elapsed-time formats, None if not a duration."""
+    if isinstance(value, datetime.timedelta):
+        seconds = value.total_seconds()
+    elif isinstance(value, bool):
+        return None
+    elif isinstance(value, (int, float)):
+        seconds = value * 86400
+    elif isinstance(value, datetime.datetime):
+        seconds = (value - EXCEL_EPOCH).total_seconds()
+    elif isinstance(value, datetime.time):
+        seconds = value.hour * 3600 + value.minute * 60 + value.second
+    else:
+        return None
+    return int(Decimal(repr(seconds)).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def _compile_date_section(section: str):
+    tokens = DATE_TOKEN_RE.findall(section)
+    lowered = [t.lower() for t in tokens]
+    twelve_hour = "am/pm" in lowered or "a/p" in lowered
+    elapsed = any(t in ELAPSED_TOKENS for t in lowered)
+    parts = []
+    for i, (tok, low) in enumerate(zip(tokens, lowered)):
+        if low in ("m", "mm"):
+            # m/mm are minutes right after hours or right before seconds
+            prev = next((u for u in map(_date_unit, reversed(lowered[:i])) if u), "")
+            nxt = next((u for u in map(_date_unit, lowered[i + 1:]) if u), "")
+            if prev == "h" or nxt == "s":
+                low = "min" if low == "m" else "mmin"
+        if tok[0] == '"':
+            parts.append(tok[1:-1])
+        elif tok[0] == "\\":
+            parts.append(tok[1])
+        elif tok[0] == "_":
+            parts.append(" ")
+        elif low in ELAPSED_TOKENS:
+            parts.append(low)
+        elif tok.startswith("[$"):
+            parts.append(tok[2:-1].split("-")[0])
+        elif tok[0] in "*[":
+            continue
+        elif low[0] in "ymdhs" or low in ("am/pm", "a/p", "min", "mmin"):
+            parts.append(low)
+        else:
+            parts.append(tok)
+
+    def fmt_elapsed(value) -> str:
+        total = _elapsed_seconds(value)
+        if total is None:
+            return str(value)
+        sign, total = ("-" if total < 0 else ""), abs(total)
+        fields = {
+            "[h]": str(total // 3600), "[hh]": f"{total // 3600:02d}",
+            "[m]": str(total // 60), "[mm]": f"{total // 60:02d}",
+            "[s]": str(total), "[ss]": f"{total:02d}",
+            "h": str(total // 3600 % 24), "hh": f"{total // 3600 % 24:02d}",
+            "min": str(total // 60 % 60), "mmin": f"{total // 60 % 60:02d}",
+            "s": str(total % 60), "ss": f"{total % 60:02d}",
+        }
+        return sign + "".join(fields.get(p, p) for p in parts)
+
+    def fmt(value) -> str:
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            value = from_excel(value)
+        if isinstance(value, datetime.timedelta):
+            value = EXCEL_EPOCH + value
+        elif isinstance(value, datetime.time):
+            value = datetime.datetime.combine(EXCEL_EPOCH.date(), value)
+        elif not isinstance(value, datetime.datetime):
+            if not isinstance(value, datetime.date):
+                return str(value)
+            value = datetime.datetime.combine(value, datetime.time())
+        hour = value.hour % 12 or 12 if twelve_hour else value.hour
+        fields = {
+            "yyyy": f"{value.year:04d}", "yy": f"{value.year % 100:02d}",
+            "mmmmm": MONTH_NAMES[value.month - 1][0], "mmmm": MONTH_NAMES[value.month - 1],
+            "mmm": MONTH_ABBRS[value.month - 1], "mm": f"{value.month:02d}", "m": str(value.month),
+            "dddd": DAY_NAMES[value.weekday()], "ddd": DAY_NAMES[value.weekday()][:3],
+            "dd": f"{value.day:02d}", "d": str(value.day),
+            "hh": f"{hour:02d}", "h": str(hour),
+            "mmin": f"{value.minute:02d}", "min": str(value.minute),
+            "ss": f"{value.second:02d}", "s": str(value.second),
+            "am/pm": "AM" if value.hour < 12 else "PM", "a/p": "A" if value.hour < 12 else "P",
+        }
+        return "".join(fields.get(p, p) for p in parts)
+
+    return fmt_elapsed if elapsed else fmt
+
+
+@lru_cache(maxsize=None)
+def compile_number_format(number_format: str):
+    """Compile an Excel number format into a function rendering a value as displayed.
+
+    Handles dates (mmm-yy -> "ago-21"), elapsed times ([h]:mm), thousands
+    separators, fixed decimals, percentages and literal prefixes/suffixes.
+    Literals between integer digits (000-000) keep their place. Anything
+    else (General, text, scientific, fractions, [<1000] conditions) is
+    rendered like Excel's General format. The fourth (text) section is not
+    used: text values are always shown as they are.
+    """
+    if not number_format or number_format in ("General", "@"):
+        return _format_general
+    sections = _split_sections(number_format)
+    if is_date_format(number_format):
+        date_fmt = _compile_date_section(sections[0])
+        return lambda value: _format_general(value) if isinstance(value, str) else date_fmt(value)
+    if re.search(r"[Ee][+-]|/|\[[<>=]", re.sub(r'"[^"]*"|\\.', "", number_format)):
+        # Scientific, fraction and conditional formats are shown like General
+        return _format_general
+
+    compiled = [_compile_number_section(section) for section in sections[:3]]
+    if None in compiled:
+        return _format_general
+    positive = compiled[0]
+    negative = compiled[1] if len(compiled) > 1 else None
+    zero = compiled[2] if len(compiled) > 2 else None
+
+    def fmt(value) -> str:
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return _format_general(value)
+        if value < 0:
+            # An explicit negative section carries its own sign or parentheses
+            text = negative(-value) if negative else "-" + positive(-value)
+        elif value == 0 and zero:
+            text = zero(value)
+        else:
+            text = positive(value)
+        return text.strip()
+
+    return fmt
+
+
+def convert_column(cells: list, format_type: str = "") -> list[str]:
+    """Convert one mapped column of cells to output text in a single pass.
+
+    valor_tal_cual renders each value with its cell's number format and
+    fecha_corta turns dates into the "ago-21" style. Formatters are
+    compiled once per distinct format and reused down the column.
+    """
+    if format_type not in ("valor_tal_cual", "fecha_corta"):
+        return [str(c.value) if c.value is not None else "" for c in cells]
+
+    short_date = compile_number_format("mmm-yy")
+    out = []
+    number_format, formatter = None, _format_general
+    for cell in cells:
+        raw = cell.value
+        if raw is None:
+            out.append("")
+        elif format_type == "fecha_corta":
+            if isinstance(raw, (datetime.date, datetime.time)):
+                out.append(short_date(raw))
+            else:
+                out.append(convert_date(str(raw)))
+        else:
+            if cell.number_format != number_format:
+                number_format = cell.number_format
+                formatter = compile_number_format(number_format)
+            out.append(formatter(raw))
+    return out
+
+
 # ---------------------------------------------------------------------------
 # Excel reader
 # ---------------------------------------------------------------------------
@@ -253,62 +574,56 @@ def peek_excel_rows(excel_path: str, sheet: str = "ESP", header_row: int = 3) ->
 
 
 def read_excel_data(excel_path: str, row_numbers: list[int], mapping: list[dict],
-                    sheet: str = "ESP") -> list[dict]:
-    """Read specific rows using the column mapping."""
-    wb = load_workbook(excel_path, data_only=True)
+                    sheet: str = "ESP", wb=None) -> list[tuple]:
+    """Read specific rows using the column mapping.
+
+    Each row is a tuple of values in mapping order rather than a dict keyed
+    by header, which keeps large selections compact. Pass an already loaded
+    workbook as wb to reuse it across calls; it is left open.
+    """
+    own_wb = wb is None
+    if own_wb:
+        wb = load_workbook(excel_path, data_only=True)
     try:
         ws = wb[sheet]
 
-        rows = []
-        for seq, row_num in enumerate(row_numbers, start=1):
-            if row_num < 1 or row_num > ws.max_row:
-                continue
-            row_data = {}
-            for m in mapping:
-                header = m["header"]
-                source = m["source"]
-
-                if not source or source == "":
-                    # Column without mapping - leave empty
-                    row_data[header] = ""
-                elif source == "(auto-incremento)":
-                    row_data[header] = str(seq)
-                elif source == "(extraer país)":
-                    from_col = m.get("from_col", "D")
-                    raw = str(ws.cell(row=row_num, column=col_letter_to_index(from_col)).value or "")
-                    row_data[header] = extract_country(raw)
-                else:
-                    col_idx = col_letter_to_index(source)
-                    cell = ws.cell(row=row_num, column=col_idx)
-                    raw = cell.value
-                    format_type = m.get("format", "")
-                    
-                    if format_type == "valor_tal_cual":
-                        # Preserve the value exactly as displayed in Excel
-                        # Use the formatted value if available, otherwise use the raw value
-                        if raw is None:
-                            row_data[header] = ""
-                        elif isinstance(raw, (int, float)):
-                            # For numbers, preserve as-is (will be converted to string when writing to Word)
-                            row_data[header] = raw
-                        elif isinstance(raw, str):
-                            # Already a string, use as-is
-                            row_data[header] = raw
-                        else:
-                            # For dates, datetime objects, etc., convert to string preserving format
-                            row_data[header] = str(raw)
-                    elif format_type == "fecha_corta":
-                        val = str(raw) if raw is not None else ""
-                        row_data[header] = convert_date(val)
-                    else:
-                        # Default: convert to string
-                        val = str(raw) if raw is not None else ""
-                        row_data[header] = val
-
-            rows.append(row_data)
-        return rows
+        # Resolve each mapped column once instead of once per cell
+        plan = []
+        for m in mapping:
+            source = m["source"]
+            if not source:
+                # Column without mapping - leave empty
+                plan.append(("", 0, ""))
+            elif source == "(auto-incremento)":
+                plan.append((source, 0, ""))
+            elif source == "(extraer país)":
+                plan.append((source, col_letter_to_index(m.get("from_col", "D")), ""))
+            else:
+                plan.append(("", col_letter_to_index(source), m.get("format", "")))
+
+        max_row = ws.max_row
+        selected = [(seq, row_num) for seq, row_num in enumerate(row_numbers, start=1)
+                    if 1 <= row_num <= max_row]
+
+        # Convert column by column, then zip the columns into row tuples
+        columns = []
+        for kind, col_idx, format_type in plan:
+            if kind == "(auto-incremento)":
+                columns.append([str(seq) for seq, _ in selected])
+            elif kind == "(extraer país)":
+                columns.append([extract_country(str(ws.cell(row=row_num, column=col_idx).value or ""))
+                                for _, row_num in selected])
+            elif col_idx:
+                cells = [ws.cell(row=row_num, column=col_idx) for _, row_num in selected]
+                columns.append(convert_column(cells, format_type))
+            else:
+                columns.append([""] * len(selected))
+        if not columns:
+            return [() for _ in selected]
+        return list(zip(*columns))
     finally:
-        wb.close()
+        if own_wb:
+            wb.close()
 
 
 # ---------------------------------------------------------------------------
@@ -377,12 +692,199 @@ def auto_map(template_cols: list[dict], excel_headers: dict) -> list[dict]:
     return mapping
 
 
+# ---------------------------------------------------------------------------
+# Render model (shared by every output format)
+# ---------------------------------------------------------------------------
+
+def cell_text(value) -> str:
+    """Render a row value as the text written into an output cell."""
+    if value is None:
+        return ""
+    if not isinstance(value, str):
+        return str(value)
+    return value
+
+
+def render_columns(mapping: list[dict]) -> list[dict]:
+    """Header, width (twips), bold and alignment of each output column."""
+    return [
+        {
+            "header": m["header"],
+            "width": m.get("width", 1500),
+            "bold": bool(m.get("bold")),
+            "align": ALIGN_MAP.get(m.get("align", "CENTER (1)"), WD_ALIGN_PARAGRAPH.CENTER).xml_value,
+        }
+        for m in mapping
+    ]
+
+
+def render_row(row: tuple) -> tuple:
+    """Cell texts of one data row (values in mapping order).
+
+    read_excel_data already returns formatted strings; rows built by other
+    callers may hold None or numbers, which are shown with str().
+    """
+    return tuple(cell_text(value) for value in row)
+
+
+def column_index(mapping: list[dict], header: str) -> int:
+    """Position of a template column in the row tuples, -1 if header is empty."""
+    if not header:
+        return -1
+    for i, m in enumerate(mapping):
+        if m["header"] == header:
+            return i
+    raise ValueError(f"Columna '{header}' no encontrada en el mapeo.")
+
+
 # ---------------------------------------------------------------------------
 # Word generation
 # ---------------------------------------------------------------------------
 
-def build_document(data_rows: list[dict], template_info: dict, mapping: list[dict],
-                   output_path: str):
+# Cell fragments kept by CellFragmentCache; repeated values stay cached while
+# unique ones (row numbers, descriptions) are evicted instead of piling up
+CELL_CACHE_SIZE = 4096
+# Characters XML 1.0 does not allow; python-docx refuses them, so they are dropped
+XML_INVALID_RE = re.compile("[\x00-\x08\x0e-\x1f\ud800-\udfff\ufffe\uffff]")
+
+
+def _run_content_xml(text: str) -> str:
+    """Serialize run text, turning tabs and line breaks into <w:tab/> / <w:br/>.
+
+    Vertical tabs and form feeds (Word's manual line and page breaks) also
+    become <w:br/>; other control characters are removed.
+    """
+    parts = []
+    for piece in re.split(r"(\t|\r\n|[\n\r\x0b\x0c])", XML_INVALID_RE.sub("", text)):
+        if piece == "\t":
+            parts.append("<w:tab/>")
+        elif piece in ("\r\n", "\n", "\r", "\x0b", "\x0c"):
+            parts.append("<w:br/>")
+        elif piece:
+            parts.append(f'<w:t xml:space="preserve">{escape(piece)}</w:t>')
+    return "".join(parts)
+
+
+def _cell_xml(style: tuple, text: str) -> str:
+    width, jc, bold = style
+    rpr = "<w:b/>" if bold else ""
+    return (
+        f'<w:tc><w:tcPr><w:tcW w:w="{width}" w:type="dxa"/></w:tcPr>'
+        f'<w:p><w:pPr><w:spacing w:after="0" w:line="240" w:lineRule="auto"/>'
+        f'<w:jc w:val="{jc}"/></w:pPr>'
+        f'<w:r><w:rPr>{rpr}<w:sz w:val="22"/></w:rPr>{_run_content_xml(text)}</w:r></w:p></w:tc>'
+    )
+
+
+class CellFragmentCache:
+    """Pre-serialized <w:tc> fragments keyed by (column style, value).
+
+    Experience tables repeat countries, entities, roles and dates across many
+    rows, so each distinct cell is serialized and encoded once and its bytes
+    reused; duplicate rows are just rows whose cells all hit. The cache keeps
+    the maxsize most recently used fragments, so columns of unique values
+    don't grow it without bound.
+    """
+
+    def __init__(self, maxsize: int = CELL_CACHE_SIZE):
+        self.cells = OrderedDict()
+        self.maxsize = maxsize
+        self.cell_hits = 0
+        self.cell_misses = 0
+
+    def cell(self, style: tuple, text: str) -> bytes:
+        key = (style, text)
+        frag = self.cells.get(key)
+        if frag is None:
+            self.cell_misses += 1
+            frag = self.cells[key] = _cell_xml(style, text).encode("utf-8")
+            if len(self.cells) > self.maxsize:
+                self.cells.popitem(last=False)
+        else:
+            self.cell_hits += 1
+            self.cells.move_to_end(key)
+        return frag
+
+    def row(self, styles: list[tuple], texts: tuple) -> bytes:
+        return b"<w:tr>" + b"".join(self.cell(st, t) for st, t in zip(styles, texts)) + b"</w:tr>"
+
+    def stats(self) -> dict:
+        """Cells written, cells serialized (misses) and the share reused."""
+        total = self.cell_hits + self.cell_misses
+        return {
+            "cells": total,
+            "unique_cells": self.cell_misses,
+            "hit_rate": self.cell_hits / total if total else 0.0,
+        }
+
+
+def merge_stats(stats: list[dict]) -> dict:
+    """Combine the fragment reuse stats of several documents."""
+    cells = sum(s["cells"] for s in stats)
+    unique = sum(s["unique_cells"] for s in stats)
+    return {"cells": cells, "unique_cells": unique, "hit_rate": (cells - unique) / cells if cells else 0.0}
+
+
+def _temp_path(path: str) -> str:
+    """Empty temp file in the same folder as path, so os.replace is atomic."""
+    target = Path(path)
+    fd, tmp = tempfile.mkstemp(prefix=f".{target.name}.", suffix=".tmp", dir=str(target.parent))
+    os.close(fd)
+    # mkstemp files are owner-only: keep the mode of the file being
+    # replaced, or give new files the mode open() would (0o666 & ~umask)
+    try:
+        mode = os.stat(path).st_mode & 0o7777
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        mode = 0o666 & ~umask
+    os.chmod(tmp, mode)
+    return tmp
+
+
+@contextmanager
+def atomic_path(path: str):
+    """Yield a temp path next to path that replaces it only on success.
+
+    A crash or error never leaves a truncated file at path.
+    """
+    tmp = _temp_path(path)
+    try:
+        yield tmp
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def _save_with_rows(doc, output_path: str, table_rows: list):
+    """Save doc, streaming serialized data rows into its tables.
+
+    table_rows holds one iterable of <w:tr> bytes per table, in document
+    order; each is written just before that table's closing tag.
+    """
+    buf = io.BytesIO()
+    doc.save(buf)
+    with atomic_path(output_path) as tmp, zipfile.ZipFile(buf) as src, \
+            zipfile.ZipFile(tmp, "w", zipfile.ZIP_DEFLATED) as dst:
+        for item in src.infolist():
+            data = src.read(item.filename)
+            if item.filename != "word/document.xml":
+                dst.writestr(item, data)
+                continue
+            parts = data.split(b"</w:tbl>")
+            with dst.open(item, "w", force_zip64=True) as out:
+                for part, rows in zip(parts, table_rows):
+                    out.write(part)
+                    for frag in rows:
+                        out.write(frag)
+                    out.write(b"</w:tbl>")
+                out.write(b"</w:tbl>".join(parts[len(table_rows):]))
+
+
+def _new_document(template_info: dict):
+    """Blank document with the template's page setup."""
     doc = Document()
     page = template_info["page"]
     section = doc.sections[0]
@@ -393,17 +895,20 @@ def build_document(data_rows: list[dict], template_info: dict, mapping: list[dic
     section.right_margin = page["right_margin"]
     section.top_margin = page["top_margin"]
     section.bottom_margin = page["bottom_margin"]
+    return doc
 
+
+def _add_title(doc, title: str):
     title_p = doc.add_paragraph()
     title_p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    run = title_p.add_run(template_info.get("title", ""))
+    run = title_p.add_run(title)
     run.bold = True
     run.font.size = Pt(11)
 
-    num_cols = len(mapping)
-    widths = [m.get("width", 1500) for m in mapping]
 
-    table = doc.add_table(rows=1 + len(data_rows), cols=num_cols)
+def _add_header_table(doc, columns: list[dict], repeat_header: bool):
+    """Add a table holding only the formatted header row."""
+    table = doc.add_table(rows=1, cols=len(columns))
 
     # Borders
     tblPr = table._tbl.find(qn("w:tblPr"))
@@ -427,64 +932,594 @@ def build_document(data_rows: list[dict], template_info: dict, mapping: list[dic
     else:
         for child in list(tblGrid):
             tblGrid.remove(child)
-    for w in widths:
-        tblGrid.append(parse_xml(f'<w:gridCol {nsdecls("w")} w:w="{w}"/>'))
+    for c in columns:
+        tblGrid.append(parse_xml(f'<w:gridCol {nsdecls("w")} w:w="{c["width"]}"/>'))
 
     # Header row
-    for i, m in enumerate(mapping):
+    if repeat_header:
+        # Word repeats rows marked tblHeader at the top of every page
+        trPr = table.rows[0]._tr.get_or_add_trPr()
+        trPr.append(parse_xml(f'<w:tblHeader {nsdecls("w")}/>'))
+    for i, c in enumerate(columns):
         cell = table.rows[0].cells[i]
         cell.text = ""
         p = cell.paragraphs[0]
         p.alignment = WD_ALIGN_PARAGRAPH.CENTER
         pPr = p._p.get_or_add_pPr()
         pPr.append(parse_xml(f'<w:spacing {nsdecls("w")} w:after="0" w:line="240" w:lineRule="auto"/>'))
-        r = p.add_run(m["header"])
+        r = p.add_run(c["header"])
         r.bold = True
         r.font.size = Pt(11)
         tcPr = cell._tc.get_or_add_tcPr()
         tcPr.append(parse_xml(f'<w:shd {nsdecls("w")} w:fill="BFBFBF" w:val="clear"/>'))
         tcPr.append(parse_xml(f'<w:vAlign {nsdecls("w")} w:val="center"/>'))
-        tcPr.append(parse_xml(f'<w:tcW {nsdecls("w")} w:w="{widths[i]}" w:type="dxa"/>'))
-
-    # Data rows
-    for row_idx, row_data in enumerate(data_rows):
-        for col_idx, m in enumerate(mapping):
-            value = row_data.get(m["header"], "")
-            # Convert to string for Word
-            # For "valor_tal_cual", preserve the exact value as displayed
-            format_type = m.get("format", "")
-            if value is None:
-                value = ""
-            elif format_type == "valor_tal_cual":
-                # Preserve the value exactly as it appears in Excel
-                # Numbers stay as numbers, text as text, dates as dates
-                if isinstance(value, (int, float)):
-                    # For numbers, convert to string preserving decimal places
-                    # This preserves the visual representation better than str()
-                    if isinstance(value, float) and value.is_integer():
-                        value = str(int(value))
-                    else:
-                        value = str(value)
-                elif not isinstance(value, str):
-                    value = str(value)
-                # If it's already a string, keep it as-is
-            elif not isinstance(value, str):
-                value = str(value)
-            cell = table.rows[row_idx + 1].cells[col_idx]
-            cell.text = ""
-            p = cell.paragraphs[0]
-            pPr = p._p.get_or_add_pPr()
-            pPr.append(parse_xml(f'<w:spacing {nsdecls("w")} w:after="0" w:line="240" w:lineRule="auto"/>'))
-            align_key = m.get("align", "CENTER (1)")
-            p.alignment = ALIGN_MAP.get(align_key, WD_ALIGN_PARAGRAPH.CENTER)
-            tcPr = cell._tc.get_or_add_tcPr()
-            tcPr.append(parse_xml(f'<w:tcW {nsdecls("w")} w:w="{widths[col_idx]}" w:type="dxa"/>'))
-            r = p.add_run(value)
-            r.font.size = Pt(11)
-            if m.get("bold"):
-                r.bold = True
-
-    doc.save(output_path)
+        tcPr.append(parse_xml(f'<w:tcW {nsdecls("w")} w:w="{c["width"]}" w:type="dxa"/>'))
+    return table
+
+
+def split_rows(data_rows: list[tuple], split_every: int = 0, split_col: int = -1) -> list[tuple[str, list[tuple]]]:
+    """Group rows by the split_col column and/or cut them every split_every rows.
+
+    Returns (label, rows) chunks in order of first appearance. Without any
+    split option everything stays in a single chunk.
+    """
+    if split_col >= 0:
+        groups = {}
+        for row in data_rows:
+            groups.setdefault(str(row[split_col] or ""), []).append(row)
+        chunks = list(groups.items())
+    else:
+        chunks = [("", data_rows)]
+
+    if split_every and split_every > 0:
+        cut = []
+        for label, rows in chunks:
+            parts = [rows[i:i + split_every] for i in range(0, len(rows), split_every)] or [rows]
+            for n, part in enumerate(parts, start=1):
+                part_label = f"parte_{n:02d}" if len(parts) > 1 or not label else ""
+                cut.append(("_".join(x for x in (label, part_label) if x), part))
+        chunks = cut
+    return chunks or [("", data_rows)]
+
+
+def build_document(data_rows: list[tuple], template_info: dict, mapping: list[dict],
+                   output_path: str, repeat_header: bool = True,
+                   split_every: int = 0, split_by: str = "") -> dict:
+    """Write the Word table and return cell fragment reuse stats.
+
+    With split_every / split_by each chunk of rows goes into its own section,
+    starting on a new page with the title and header row.
+    """
+    doc = _new_document(template_info)
+    columns = render_columns(mapping)
+
+    # Data rows are streamed into the saved file as cached fragments
+    cache = CellFragmentCache()
+    styles = [(c["width"], c["align"], c["bold"]) for c in columns]
+
+    table_rows = []
+    chunks = split_rows(data_rows, split_every, column_index(mapping, split_by))
+    for n, (_, rows) in enumerate(chunks):
+        if n:
+            doc.add_section(WD_SECTION.NEW_PAGE)
+        _add_title(doc, template_info.get("title", ""))
+        _add_header_table(doc, columns, repeat_header)
+        table_rows.append(cache.row(styles, render_row(row)) for row in rows)
+
+    _save_with_rows(doc, output_path, table_rows)
+    return cache.stats()
+
+
+def _chunk_paths(output_path: str, labels: list[str]) -> list[str]:
+    """One file name per chunk label, unique even after sanitising.
+
+    Labels such as "A/B" and "A B", or names differing only in case (the
+    same file on Windows), would otherwise share a path; later ones get a
+    _2, _3... suffix.
+    """
+    out = Path(output_path)
+    taken = set()
+    paths = []
+    for label in labels:
+        clean = re.sub(r'[\\/:*?"<>|\s]+', "_", label).strip("_") or "sin_valor"
+        base = f"{out.stem}_{clean}"
+        name, n = base, 1
+        while name.lower() in taken:
+            n += 1
+            name = f"{base}_{n}"
+        taken.add(name.lower())
+        paths.append(str(out.with_name(f"{name}{out.suffix}")))
+    return paths
+
+
+def build_documents(data_rows: list[tuple], template_info: dict, mapping: list[dict],
+                    output_path: str, split_every: int = 0, split_by: str = "",
+                    repeat_header: bool = True, max_workers: int = 0) -> tuple[list[str], dict]:
+    """Write one Word file per chunk of rows, in parallel processes.
+
+    Files are named after output_path plus the chunk label, e.g.
+    Tabla_parte_01.docx or Tabla_Argentina.docx. Returns the written
+    paths and the combined cell fragment reuse stats.
+    """
+    chunks = split_rows(data_rows, split_every, column_index(mapping, split_by))
+    if len(chunks) == 1:
+        return [output_path], build_document(data_rows, template_info, mapping, output_path, repeat_header)
+
+    paths = _chunk_paths(output_path, [label for label, _ in chunks])
+    with ProcessPoolExecutor(max_workers=max_workers or None) as pool:
+        futures = [
+            pool.submit(build_document, rows, template_info, mapping, path, repeat_header)
+            for (_, rows), path in zip(chunks, paths)
+        ]
+        stats = [f.result() for f in futures]
+    return paths, merge_stats(stats)
+
+
+class DocxWriter:
+    """Word output fed one rendered row at a time.
+
+    Row fragments are spooled to a temp file and spliced into the
+    document on close(), so memory stays flat for long tables.
+    """
+
+    def __init__(self, path: str, template_info: dict, columns: list[dict], repeat_header: bool = True):
+        self.path = path
+        self.doc = _new_document(template_info)
+        _add_title(self.doc, template_info.get("title", ""))
+        _add_header_table(self.doc, columns, repeat_header)
+        self.cache = CellFragmentCache()
+        self.styles = [(c["width"], c["align"], c["bold"]) for c in columns]
+        self.spool = tempfile.TemporaryFile()
+
+    def write_row(self, texts: tuple):
+        self.spool.write(self.cache.row(self.styles, texts))
+
+    def close(self) -> dict:
+        """Save the document and return the cell fragment reuse stats."""
+        self.spool.seek(0)
+        _save_with_rows(self.doc, self.path, [iter(lambda: self.spool.read(1 << 20), b"")])
+        self.spool.close()
+        return self.cache.stats()
+
+    def abort(self):
+        self.spool.close()
+
+
+# ---------------------------------------------------------------------------
+# CSV / HTML / PDF output
+# ---------------------------------------------------------------------------
+
+HTML_ALIGN = {"left": "left", "center": "center", "right": "right", "both": "justify"}
+PDF_FONT_SIZE = 11
+PDF_CELL_PADDING = 3
+
+
+class CsvWriter:
+    """CSV output (UTF-8 with BOM so Excel detects the encoding)."""
+
+    def __init__(self, path: str, template_info: dict, columns: list[dict], repeat_header: bool = True):
+        self.path = path
+        self.tmp = _temp_path(path)
+        try:
+            self.out = open(self.tmp, "w", encoding="utf-8-sig", newline="")
+            self.writer = csv.writer(self.out)
+            self.writer.writerow([c["header"] for c in columns])
+        except BaseException:
+            self.abort()
+            raise
+
+    def write_row(self, texts: tuple):
+        self.writer.writerow(texts)
+
+    def close(self):
+        self.out.close()
+        os.replace(self.tmp, self.path)
+
+    def abort(self):
+        if hasattr(self, "out"):
+            self.out.close()
+        if os.path.exists(self.tmp):
+            os.remove(self.tmp)
+
+
+def _html_text(text: str) -> str:
+    return html.escape(text).replace("\r\n", "<br>").replace("\n", "<br>").replace("\t", " ")
+
+
+class HtmlWriter:
+    """Standalone HTML page with the table, written row by row."""
+
+    def __init__(self, path: str, template_info: dict, columns: list[dict], repeat_header: bool = True):
+        self.path = path
+        title = _html_text(template_info.get("title", ""))
+        col_css = "\n".join(
+            f"td.c{i} {{ text-align: {HTML_ALIGN.get(c['align'], 'center')};"
+            f"{' font-weight: bold;' if c['bold'] else ''} }}"
+            for i, c in enumerate(columns)
+        )
+        head = (
+            "<!DOCTYPE html>\n<html lang=\"es\">\n<head>\n<meta charset=\"utf-8\">\n"
+            f"<title>{title}</title>\n<style>\n"
+            "body { font-family: Calibri, Arial, sans-serif; font-size: 11pt; }\n"
+            "p.title { text-align: center; font-weight: bold; }\n"
+            "table { border-collapse: collapse; table-layout: fixed; }\n"
+            "th, td { border: 1px solid #000; padding: 2px 4px; vertical-align: top; }\n"
+            "th { background: #BFBFBF; text-align: center; vertical-align: middle; }\n"
+            f"{col_css}\n</style>\n</head>\n<body>\n<p class=\"title\">{title}</p>\n<table>\n<colgroup>"
+            # Word widths are twips; 15 twips = 1 CSS px
+            + "".join(f'<col style="width: {round(c["width"] / 15)}px">' for c in columns)
+            + "</colgroup>\n<thead><tr>"
+            + "".join(f"<th>{_html_text(c['header'])}</th>" for c in columns)
+            + "</tr></thead>\n<tbody>\n"
+        )
+        self.tmp = _temp_path(path)
+        try:
+            self.out = open(self.tmp, "w", encoding="utf-8", newline="\n")
+            self.out.write(head)
+        except BaseException:
+            self.abort()
+            raise
+        self.cells = [f'<td class="c{i}">' for i in range(len(columns))]
+
+    def write_row(self, texts: tuple):
+        self.out.write("<tr>" + "".join(f"{td}{_html_text(t)}</td>" for td, t in zip(self.cells, texts))
+                       + "</tr>\n")
+
+    def close(self):
+        self.out.write("</tbody>\n</table>\n</body>\n</html>\n")
+        self.out.close()
+        os.replace(self.tmp, self.path)
+
+    def abort(self):
+        if hasattr(self, "out"):
+            self.out.close()
+        if os.path.exists(self.tmp):
+            os.remove(self.tmp)
+
+
+class PdfWriter:
+    """PDF output drawn directly with reportlab, one row at a time.
+
+    Uses the template's page size, margins and column widths (scaled down
+    if they overflow the page) and repeats the header row on every page.
+    """
+
+    def __init__(self, path: str, template_info: dict, columns: list[dict], repeat_header: bool = True):
+        self.path = path
+        self.columns = columns
+        self.repeat_header = repeat_header
+        page = template_info["page"]
+        width, height = Emu(page["width"]).pt, Emu(page["height"]).pt
+        self.left = Emu(page["left_margin"]).pt
+        self.top = height - Emu(page["top_margin"]).pt
+        self.bottom = Emu(page["bottom_margin"]).pt
+        usable = width - self.left - Emu(page["right_margin"]).pt
+        widths = [c["width"] / 20 for c in columns]
+        scale = min(1.0, usable / sum(widths)) if widths else 1.0
+        self.widths = [w * scale for w in widths]
+        self.leading = PDF_FONT_SIZE * 1.15
+
+        self.tmp = _temp_path(path)
+        try:
+            self.canvas = pdf_canvas.Canvas(self.tmp, pagesize=(width, height))
+            self.canvas.setTitle(template_info.get("title", ""))
+            self.canvas.setLineWidth(0.5)
+            self.y = self.top
+            title = template_info.get("title", "")
+            if title:
+                self.canvas.setFont("Helvetica-Bold", PDF_FONT_SIZE)
+                self.canvas.drawCentredString(self.left + usable / 2, self.y - PDF_FONT_SIZE, title)
+                self.y -= self.leading * 2
+            self._draw_header()
+        except BaseException:
+            self.abort()
+            raise
+
+    def _draw_header(self):
+        self._draw_row([c["header"] for c in self.columns], [True] * len(self.columns),
+                       ["center"] * len(self.columns), header=True)
+
+    def _draw_row(self, texts, bolds, aligns, header=False):
+        c = self.canvas
+        pad = PDF_CELL_PADDING
+        fonts = ["Helvetica-Bold" if b else "Helvetica" for b in bolds]
+        lines = [
+            simpleSplit(str(t).replace("\t", " "), font, PDF_FONT_SIZE, w - 2 * pad) or [""]
+            for t, font, w in zip(texts, fonts, self.widths)
+        ]
+        row_height = max(len(ls) for ls in lines) * self.leading + 2 * pad
+        if not header and self.y - row_height < self.bottom:
+            c.showPage()
+            c.setLineWidth(0.5)
+            self.y = self.top
+            if self.repeat_header:
+                self._draw_header()
+
+        x = self.left
+        for ls, font, align, w in zip(lines, fonts, aligns, self.widths):
+            if header:
+                c.setFillColor(colors.HexColor("#BFBFBF"))
+                c.rect(x, self.y - row_height, w, row_height, stroke=1, fill=1)
+                c.setFillColor(colors.black)
+            else:
+                c.rect(x, self.y - row_height, w, row_height, stroke=1, fill=0)
+            c.setFont(font, PDF_FONT_SIZE)
+            baseline = self.y - pad - PDF_FONT_SIZE
+            for line in ls:
+                if align == "center":
+                    c.drawCentredString(x + w / 2, baseline, line)
+                elif align == "right":
+                    c.drawRightString(x + w - pad, baseline, line)
+                else:
+                    c.drawString(x + pad, baseline, line)
+                baseline -= self.leading
+            x += w
+        self.y -= row_height
+
+    def write_row(self, texts: tuple):
+        self._draw_row(texts, [col["bold"] for col in self.columns], [col["align"] for col in self.columns])
+
+    def close(self):
+        self.canvas.save()
+        os.replace(self.tmp, self.path)
+
+    def abort(self):
+        if os.path.exists(self.tmp):
+            os.remove(self.tmp)
+
+
+OUTPUT_WRITERS = {
+    "docx": DocxWriter,
+    "csv": CsvWriter,
+    "html": HtmlWriter,
+    "pdf": PdfWriter,
+}
+
+
+def export_formats(data_rows: list[tuple], template_info: dict, mapping: list[dict],
+                   output_path: str, formats: list[str], repeat_header: bool = True) -> tuple[list[str], dict]:
+    """Write several formats from the same rendered rows in a single pass.
+
+    Each file takes output_path with the format's extension
+    (Tabla.docx, Tabla.csv, ...). Returns the written paths and the Word
+    cell fragment reuse stats.
+    """
+    columns = render_columns(mapping)
+    base = Path(output_path)
+    writers, stats = [], []
+    try:
+        for fmt in formats:
+            writers.append(OUTPUT_WRITERS[fmt](str(base.with_suffix(f".{fmt}")), template_info, columns,
+                                               repeat_header))
+        for row in data_rows:
+            texts = render_row(row)
+            for w in writers:
+                w.write_row(texts)
+        for w in writers:
+            stats.append(w.close())
+    except BaseException:
+        # Leave any previous outputs untouched and drop the partial ones;
+        # writers closed before the failure keep their finished file
+        for w in writers[len(stats):]:
+            w.abort()
+        raise
+    return [w.path for w in writers], merge_stats([s for s in stats if s])
+
+
+# ---------------------------------------------------------------------------
+# Output generation and resumable batch jobs
+# ---------------------------------------------------------------------------
+
+def parse_rows(text: str) -> list[int]:
+    """Parse '5, 10-15 20' into row numbers."""
+    raw = text.strip().replace(",", " ").replace(";", " ")
+    rows = []
+    for p in raw.split():
+        p = p.strip()
+        if not p:
+            continue
+        if "-" in p and not p.startswith("-"):
+            a, b = p.split("-", 1)
+            rows.extend(range(int(a), int(b) + 1))
+        else:
+            rows.append(int(p))
+    return rows
+
+
+def generate_outputs(data_rows: list[tuple], template_info: dict, mapping: list[dict],
+                     output_path: str, extra_formats: list[str] = (), repeat_header: bool = True,
+                     split_every: int = 0, split_by: str = "",
+                     split_files: bool = False) -> tuple[list[str], dict]:
+    """Write the Word output plus any extra formats.
+
+    Returns the written paths and the Word cell fragment reuse stats.
+    """
+    extra_formats = list(extra_formats)
+    if not (split_every or split_by):
+        return export_formats(data_rows, template_info, mapping, output_path,
+                              ["docx"] + extra_formats, repeat_header)
+
+    if split_files:
+        paths, stats = build_documents(data_rows, template_info, mapping, output_path,
+                                       split_every, split_by, repeat_header)
+    else:
+        stats = build_document(data_rows, template_info, mapping, output_path,
+                               repeat_header, split_every, split_by)
+        paths = [output_path]
+    if extra_formats:
+        paths += export_formats(data_rows, template_info, mapping, output_path,
+                                extra_formats, repeat_header)[0]
+    return paths, stats
+
+
+def _planned_outputs(data_rows: list[tuple], mapping: list[dict], output_path: str,
+                     extra_formats: list[str] = (), split_every: int = 0, split_by: str = "",
+                     split_files: bool = False) -> list[str]:
+    """Paths generate_outputs will write for these arguments."""
+    paths = [output_path]
+    if split_files and (split_every or split_by):
+        chunks = split_rows(data_rows, split_every, column_index(mapping, split_by))
+        if len(chunks) > 1:
+            paths = _chunk_paths(output_path, [label for label, _ in chunks])
+    return paths + [str(Path(output_path).with_suffix(f".{fmt}")) for fmt in extra_formats]
+
+
+def _remove_temp_files(paths: list[str]):
+    """Delete the temp files _temp_path made for exactly these outputs."""
+    for path in paths:
+        p = Path(path)
+        for tmp in p.parent.glob(f".{glob.escape(p.name)}.*.tmp"):
+            tmp.unlink()
+
+
+def _file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _files_intact(files: dict) -> bool:
+    """True if every recorded output still exists with the recorded size and hash."""
+    for path, state in files.items():
+        p = Path(path)
+        if not p.is_file() or p.stat().st_size != state["size"] or _file_sha256(path) != state["sha256"]:
+            return False
+    return True
+
+
+def load_manifest(manifest_path: str) -> dict:
+    """Read the batch manifest, or start an empty one."""
+    if Path(manifest_path).is_file():
+        with open(manifest_path, encoding="utf-8") as f:
+            return json.load(f)
+    return {"version": 1, "outputs": {}}
+
+
+def save_manifest(manifest: dict, manifest_path: str):
+    """Write the batch manifest atomically."""
+    with atomic_path(manifest_path) as tmp:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+
+def run_batch(jobs: list[dict], manifest_path: str, log=print) -> dict:
+    """Run generation jobs, skipping outputs that are already up to date.
+
+    Each job needs "template", "excel", "rows" and "output"; "sheet",
+    "header_row", "mapping" (auto-mapped when missing), "formats",
+    "repeat_header", "split_every", "split_by" and "split_files" are
+    optional. The manifest records, per output, a hash of the template,
+    mapping, options and source row contents plus the size and hash of
+    every written file. Outputs marked "writing" (an interrupted run),
+    with changed inputs, or with missing/altered files are regenerated.
+    Returns counts of written, skipped and failed jobs.
+    """
+    manifest = load_manifest(manifest_path)
+    outputs = manifest.setdefault("outputs", {})
+    counts = {"written": 0, "skipped": 0, "failed": 0}
+    templates = {}
+    headers = {}
+    wb_path, wb = None, None
+
+    try:
+        for job in jobs:
+            output = str(Path(job["output"]).resolve())
+            try:
+                template = job["template"]
+                if template not in templates:
+                    templates[template] = (read_template(template), _file_sha256(template))
+                template_info, template_sha = templates[template]
+
+                excel = job["excel"]
+                sheet = job.get("sheet", "ESP")
+                mapping = job.get("mapping")
+                if not mapping:
+                    key = (excel, sheet, job.get("header_row", 3))
+                    if key not in headers:
+                        headers[key] = read_excel_headers(*key)
+                    mapping = auto_map(template_info["columns"], headers[key])
+
+                # Keep the last workbook open: consecutive jobs usually share it
+                if excel != wb_path:
+                    if wb is not None:
+                        wb.close()
+                    wb_path, wb = excel, load_workbook(excel, data_only=True)
+                rows = job["rows"]
+                row_numbers = parse_rows(rows) if isinstance(rows, str) else list(rows)
+                data = read_excel_data(excel, row_numbers, mapping, sheet, wb=wb)
+
+                options = {
+                    "formats": job.get("formats", []),
+                    "repeat_header": job.get("repeat_header", True),
+                    "split_every": job.get("split_every", 0),
+                    "split_by": job.get("split_by", ""),
+                    "split_files": job.get("split_files", False),
+                }
+                digest = hashlib.sha256(json.dumps(
+                    [template_sha, mapping, sheet, row_numbers, options, data],
+                    ensure_ascii=False, sort_keys=True, default=str,
+                ).encode("utf-8")).hexdigest()
+
+                entry = outputs.get(output)
+                if (entry and entry.get("state") == "done" and entry.get("inputs") == digest
+                        and _files_intact(entry.get("files", {}))):
+                    counts["skipped"] += 1
+                    log(f"Sin cambios: {output}")
+                    continue
+
+                if entry and entry.get("state") == "writing":
+                    # A killed run may have left temp files next to its outputs
+                    _remove_temp_files(entry.get("targets", [output]))
+                targets = _planned_outputs(
+                    data, mapping, output, options["formats"],
+                    options["split_every"], options["split_by"], options["split_files"],
+                )
+                outputs[output] = {"inputs": digest, "state": "writing", "targets": targets}
+                save_manifest(manifest, manifest_path)
+
+                paths, stats = generate_outputs(
+                    data, template_info, mapping, output, options["formats"], options["repeat_header"],
+                    options["split_every"], options["split_by"], options["split_files"],
+                )
+                outputs[output] = {
+                    "inputs": digest,
+                    "state": "done",
+                    "files": {
+                        str(Path(p).resolve()): {"size": Path(p).stat().st_size, "sha256": _file_sha256(p)}
+                        for p in paths
+                    },
+                }
+                save_manifest(manifest, manifest_path)
+                counts["written"] += 1
+                log(f"Generado: {output} (celdas reutilizadas: {stats['hit_rate']:.0%})")
+            except Exception as e:
+                counts["failed"] += 1
+                outputs[output] = {**outputs.get(output, {}), "state": "error", "error": str(e)}
+                save_manifest(manifest, manifest_path)
+                log(f"Error en {output}: {e}")
+    finally:
+        if wb is not None:
+            wb.close()
+    return counts
+
+
+def run_batch_file(jobs_path: str, manifest_path: str = "") -> dict:
+    """Run the jobs listed in a JSON file (a list, or {"jobs": [...]}).
+
+    Relative paths are resolved against the jobs file's folder. The
+    manifest defaults to <jobs>.manifest.json next to it.
+    """
+    jobs_file = Path(jobs_path).resolve()
+    with open(jobs_file, encoding="utf-8") as f:
+        spec = json.load(f)
+    jobs = spec["jobs"] if isinstance(spec, dict) else spec
+    for job in jobs:
+        for key in ("template", "excel", "output"):
+            job[key] = str(jobs_file.parent / job[key])
+    manifest = manifest_path or str(jobs_file.with_name(f"{jobs_file.stem}.manifest.json"))
+    return run_batch(jobs, manifest)
 
 
 # ---------------------------------------------------------------------------
@@ -495,13 +1530,17 @@ class App(tk.Tk):
     def __init__(self):
         super().__init__()
         self.title("Exp Table Generator")
-        self.geometry("850x700")
+        self.geometry("850x790")
         self.resizable(True, True)
 
         self.template_path = tk.StringVar()
         self.excel_path = tk.StringVar()
         self.sheet_var = tk.StringVar(value="ESP")
         self.header_row_var = tk.StringVar(value="3")
+        self.repeat_header_var = tk.BooleanVar(value=True)
+        self.split_every_var = tk.StringVar(value="")
+        self.split_files_var = tk.BooleanVar(value=False)
+        self.extra_format_vars = {fmt: tk.BooleanVar(value=False) for fmt in ("csv", "html", "pdf")}
 
         self.template_info = None
         self.excel_headers = {}
@@ -559,10 +1598,31 @@ class App(tk.Tk):
         self.rows_entry.insert(0, "50, 51")
         self.rows_entry.pack(side="left", padx=5, pady=5, fill="x", expand=True)
 
+        # --- Output options ---
+        f_out = tk.LabelFrame(self, text="Salida (tablas grandes y otros formatos)", **pad)
+        f_out.pack(fill="x", **pad)
+        f_out_split = tk.Frame(f_out)
+        f_out_split.pack(fill="x")
+        tk.Checkbutton(f_out_split, text="Repetir encabezado en cada página",
+                       variable=self.repeat_header_var).pack(side="left", padx=5)
+        tk.Label(f_out_split, text="Dividir cada").pack(side="left", padx=(15, 0))
+        tk.Entry(f_out_split, textvariable=self.split_every_var, width=6).pack(side="left", padx=3)
+        tk.Label(f_out_split, text="filas  Agrupar por:").pack(side="left")
+        self.split_by_combo = ttk.Combobox(f_out_split, values=["(ninguno)"], width=22, state="readonly")
+        self.split_by_combo.set("(ninguno)")
+        self.split_by_combo.pack(side="left", padx=3)
+        tk.Checkbutton(f_out_split, text="Un archivo por parte",
+                       variable=self.split_files_var).pack(side="left", padx=10)
+        f_out_fmt = tk.Frame(f_out)
+        f_out_fmt.pack(fill="x")
+        tk.Label(f_out_fmt, text="También generar:").pack(side="left", padx=5)
+        for fmt, var in self.extra_format_vars.items():
+            tk.Checkbutton(f_out_fmt, text=fmt.upper(), variable=var).pack(side="left", padx=3)
+
         # --- Generate ---
         f_gen = tk.Frame(self)
         f_gen.pack(fill="x", **pad)
-        tk.Button(f_gen, text="Generar Word", command=self._generate,
+        tk.Button(f_gen, text="Generar", command=self._generate,
                   bg="#4CAF50", fg="white", font=("Arial", 12, "bold"),
                   height=2, width=22).pack(pady=8)
 
@@ -677,10 +1737,10 @@ class App(tk.Tk):
                 "align": m.get("align", "CENTER (1)"),
             })
 
-        self.mapping_hint.config(text=f"Se auto-mapearon {len(mapping)} columnas. Ajustá si es necesario. Podés elegir varias columnas del Excel (Ctrl+clic o Cmd+clic) para una columna del template; los valores se concatenan con " - "
-
+        self.split_by_combo.config(values=["(ninguno)"] + [m["header"] for m in mapping])
+        self.split_by_combo.set("(ninguno)")
 
-.")
+        self.mapping_hint.config(text=f"Se auto-mapearon {len(mapping)} columnas. Ajustá si es necesario.")
 
     def _get_final_mapping(self) -> list[dict]:
         mapping = []
@@ -721,18 +1781,7 @@ class App(tk.Tk):
     # ----- Row parsing -----
 
     def _parse_rows(self) -> list[int]:
-        raw = self.rows_entry.get().strip().replace(",", " ").replace(";", " ")
-        rows = []
-        for p in raw.split():
-            p = p.strip()
-            if not p:
-                continue
-            if "-" in p and not p.startswith("-"):
-                a, b = p.split("-", 1)
-                rows.extend(range(int(a), int(b) + 1))
-            else:
-                rows.append(int(p))
-        return rows
+        return parse_rows(self.rows_entry.get())
 
     # ----- Generate -----
 
@@ -757,6 +1806,15 @@ class App(tk.Tk):
             messagebox.showwarning("Atención", "Ingresá al menos un número de fila.")
             return
 
+        try:
+            split_every = int(self.split_every_var.get().strip() or "0")
+        except ValueError:
+            messagebox.showerror("Error", "La cantidad de filas para dividir debe ser un número.")
+            return
+        split_by = self.split_by_combo.get().strip()
+        if split_by == "(ninguno)":
+            split_by = ""
+
         mapping = self._get_final_mapping()
         if not mapping:
             messagebox.showwarning("Atención", "Todas las columnas están sin mapear.")
@@ -782,15 +1840,27 @@ class App(tk.Tk):
                 messagebox.showwarning("Atención", "No se obtuvieron datos para esas filas.")
                 return
 
-            build_document(data, self.template_info, mapping, output)
-            self.status_var.set(f"Listo: {output}")
-            messagebox.showinfo("Éxito", f"Documento generado con {len(data)} filas:\n\n{output}")
+            extra_formats = [fmt for fmt, var in self.extra_format_vars.items() if var.get()]
+            paths, stats = generate_outputs(data, self.template_info, mapping, output, extra_formats,
+                                     self.repeat_header_var.get(), split_every, split_by,
+                                     self.split_files_var.get())
+
+            self.status_var.set(f"Listo: {len(paths)} archivo(s) en {Path(output).parent} "
+                                f"(celdas reutilizadas: {stats['hit_rate']:.0%})")
+            messagebox.showinfo("Éxito", f"Se generaron {len(paths)} archivo(s) con {len(data)} filas:\n\n"
+                                         + "\n".join(Path(p).name for p in paths[:20]))
         except Exception as e:
             self.status_var.set(f"Error: {e}")
             messagebox.showerror("Error", str(e))
 
 
 def main():
+    multiprocessing.freeze_support()
+    if len(sys.argv) > 2 and sys.argv[1] == "--batch":
+        # exp_table_generator.py --batch trabajos.json [manifiesto.json]
+        counts = run_batch_file(sys.argv[2], sys.argv[3] if len(sys.argv) > 3 else "")
+        print(f"Generados: {counts['written']}  Sin cambios: {counts['skipped']}  Errores: {counts['failed']}")
+        sys.exit(1 if counts["failed"] else 0)
     app = App()
     app.mainloop()
 
@@ -0,0 +1,299 @@
+import datetime
+import os
+import stat
+import sys
+
+import pytest
+from openpyxl import Workbook
+from docx import Document
+from docx.oxml.ns import qn
+
+import exp_table_generator
+from exp_table_generator import (
+    CellFragmentCache, _planned_outputs, _remove_temp_files, _temp_path, build_document,
+    compile_number_format, export_formats, load_manifest, merge_stats, read_excel_data, run_batch,
+    split_rows,
+)
+
+TEMPLATE_INFO = {
+    "title": "Antecedentes",
+    "page": {"width": 10058400, "height": 7772400, "orientation": 1, "left_margin": 1143000,
+             "right_margin": 1143000, "top_margin": 914400, "bottom_margin": 914400},
+}
+MAPPING = [
+    {"header": "Entidad", "width": 3000, "bold": False, "align": "CENTER (1)", "source": "B", "format": ""},
+    {"header": "Monto", "width": 2000, "bold": False, "align": "RIGHT (2)", "source": "C", "format": ""},
+]
+ROWS = [("Ministerio", 1500.5), ("Municipio", 20)]
+
+
+@pytest.mark.parametrize(
+    "number_format, value, expected",
+    [
+        ("[h]:mm", datetime.timedelta(days=1, hours=6), "30:00"),
+        ("[h]:mm", 1.25, "30:00"),
+        ("[h]:mm", -0.5, "-12:00"),
+        ("[h]:mm:ss", datetime.time(3, 4, 5), "3:04:05"),
+        ("[mm]:ss", 0.01, "14:24"),
+        ("hh:mm:ss", datetime.timedelta(hours=3, minutes=2), "03:02:00"),
+        ("h:mm", 0.5, "12:00"),
+        ("mmm-yy", datetime.datetime(2021, 8, 1), "ago-21"),
+        ("dd/mm/yyyy", datetime.datetime(2021, 8, 3), "03/08/2021"),
+    ],
+)
+def test_date_and_elapsed_formats(number_format, value, expected):
+    assert compile_number_format(number_format)(value) == expected
+
+
+@pytest.mark.parametrize(
+    "number_format, value, expected",
+    [
+        ("0.00", 2.675, "2,68"),
+        ("0", 2.5, "3"),
+        ("#,##0", 1234.5, "1.235"),
+        ("#,##0.00", 1234567.005, "1.234.567,01"),
+        ("0%", 0.125, "13%"),
+        ("0.0%", 0.0005, "0,1%"),
+        ("#,##0;-#,##0;;@", 0, ""),
+        ("#,##0;-#,##0;;@", -1234, "-1.234"),
+        ("#,##0;-#,##0;;@", 1234.5, "1.235"),
+        ("0;;0", -5, ""),
+        ("0;;0", 0, "0"),
+        ("0.0;(0.0)", -2.25, "(2,3)"),
+        ("0.00", 1e27, "1" + "0" * 27 + ",00"),
+        ("#,##0.00", 2.5e26, "250" + ".000" * 8 + ",00"),
+        ("000-000", 123456, "123-456"),
+        ("000-000", 12, "000-012"),
+        ("(000) 000-0000", 5551234567, "(555) 123-4567"),
+        ('00"-"00.0', 1234.56, "12-34,6"),
+    ],
+)
+def test_number_formats_round_half_up(number_format, value, expected):
+    assert compile_number_format(number_format)(value) == expected
+
+
+@pytest.mark.parametrize(
+    "number_format", ["# ?/?", "# ??/??", "0.00E+00", '[<1000]0;#,##0,"k"', "0.0-0", "#,##0-00"],
+)
+def test_unsupported_formats_fall_back_to_general(number_format):
+    assert compile_number_format(number_format)(1.5) == "1,5"
+    assert compile_number_format(number_format)(5000) == "5000"
+
+
+def test_merge_stats_combines_documents():
+    merged = merge_stats([
+        {"cells": 10, "unique_cells": 4, "hit_rate": 0.6},
+        {"cells": 30, "unique_cells": 6, "hit_rate": 0.8},
+    ])
+    assert merged == {"cells": 40, "unique_cells": 10, "hit_rate": 0.75}
+    assert merge_stats([])["hit_rate"] == 0.0
+
+
+def test_export_formats_writes_every_format(tmp_path):
+    paths, stats = export_formats(ROWS, TEMPLATE_INFO, MAPPING, str(tmp_path / "T.docx"),
+                                  ["docx", "csv", "html", "pdf"])
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["T.csv", "T.docx", "T.html", "T.pdf"]
+    assert len(paths) == 4 and stats["cells"] == 4
+
+
+def test_export_formats_cleans_up_when_docx_close_fails(tmp_path, monkeypatch):
+    def fail(*args):
+        raise OSError("disco lleno")
+
+    monkeypatch.setattr(exp_table_generator, "_save_with_rows", fail)
+    with pytest.raises(OSError):
+        export_formats(ROWS, TEMPLATE_INFO, MAPPING, str(tmp_path / "T.docx"), ["docx", "csv", "pdf"])
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_export_formats_cleans_up_when_a_writer_cannot_start(tmp_path, monkeypatch):
+    def fail(*args, **kwargs):
+        raise OSError("sin permiso")
+
+    monkeypatch.setattr(exp_table_generator.pdf_canvas, "Canvas", fail)
+    with pytest.raises(OSError):
+        export_formats(ROWS, TEMPLATE_INFO, MAPPING, str(tmp_path / "T.docx"), ["csv", "html", "pdf"])
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_planned_outputs_match_split_files(tmp_path):
+    rows = [("A/B", 1), ("A B", 2), ("a b", 3)]
+    out = str(tmp_path / "T.docx")
+    assert _planned_outputs(rows, MAPPING, out, ["csv"]) == [out, str(tmp_path / "T.csv")]
+    assert [p.rsplit("/", 1)[-1] for p in _planned_outputs(rows, MAPPING, out, [], 0, "Entidad", True)] == [
+        "T_A_B.docx", "T_A_B_2.docx", "T_a_b_3.docx",
+    ]
+
+
+def test_remove_temp_files_only_touches_the_given_outputs(tmp_path):
+    for name in (".T[1].docx.abc.tmp", ".T_2.docx.abc.tmp", ".T[1].csv.x.tmp", "T[1].docx"):
+        (tmp_path / name).write_text("")
+    _remove_temp_files([str(tmp_path / "T[1].docx"), str(tmp_path / "T[1].csv")])
+    assert sorted(p.name for p in tmp_path.iterdir()) == [".T_2.docx.abc.tmp", "T[1].docx"]
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="POSIX permissions")
+def test_temp_path_keeps_mode_of_replaced_file(tmp_path):
+    target = tmp_path / "T.docx"
+    target.write_text("")
+    target.chmod(0o600)
+    assert stat.S_IMODE(os.stat(_temp_path(str(target))).st_mode) == 0o600
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="POSIX permissions")
+def test_temp_path_applies_umask_to_new_files(tmp_path):
+    old = os.umask(0o027)
+    try:
+        tmp = _temp_path(str(tmp_path / "T.docx"))
+    finally:
+        os.umask(old)
+    assert stat.S_IMODE(os.stat(tmp).st_mode) == 0o640
+
+
+def test_docx_drops_xml_invalid_characters(tmp_path):
+    rows = [("línea 1\x0blínea 2", "a\x01b\x1fc"), ("\x00", 3)]
+    paths, _ = export_formats(rows, TEMPLATE_INFO, MAPPING, str(tmp_path / "T.docx"), ["docx"])
+    table = Document(paths[0]).tables[-1]
+    assert [[c.text for c in r.cells] for r in table.rows[1:]] == [["línea 1\nlínea 2", "abc"], ["", "3"]]
+
+
+def test_cell_fragment_cache_evicts_least_recently_used():
+    cache = CellFragmentCache(maxsize=2)
+    style = (1500, "center", False)
+    for n in range(100):
+        cache.cell(style, "Argentina")
+        cache.cell(style, str(n))
+    assert len(cache.cells) == 2
+    assert (style, "Argentina") in cache.cells
+    assert cache.stats() == {"cells": 200, "unique_cells": 101, "hit_rate": 99 / 200}
+
+
+def test_split_rows_without_options_keeps_one_chunk():
+    assert split_rows(ROWS) == [("", ROWS)]
+
+
+def test_split_rows_every_n_rows():
+    rows = [(str(n), n) for n in range(5)]
+    assert split_rows(rows, split_every=2) == [
+        ("parte_01", rows[0:2]), ("parte_02", rows[2:4]), ("parte_03", rows[4:5]),
+    ]
+
+
+def test_split_rows_by_column_then_every_n_rows():
+    rows = [("B", 1), ("A", 2), ("B", 3), (None, 4), ("B", 5)]
+    assert split_rows(rows, split_every=2, split_col=0) == [
+        ("B_parte_01", [rows[0], rows[2]]), ("B_parte_02", [rows[4]]), ("A", [rows[1]]), ("parte_01", [rows[3]]),
+    ]
+
+
+def test_build_document_puts_each_chunk_in_its_own_section(tmp_path):
+    rows = [(f"Entidad {n}", n) for n in range(5)]
+    path = str(tmp_path / "T.docx")
+    stats = build_document(rows, TEMPLATE_INFO, MAPPING, path, split_every=2)
+    doc = Document(path)
+    assert stats["cells"] == 10
+    assert len(doc.sections) == 3
+    assert [p.text for p in doc.paragraphs if p.text] == ["Antecedentes"] * 3
+    assert [len(t.rows) for t in doc.tables] == [3, 3, 2]
+    for table in doc.tables:
+        assert table.rows[0].cells[0].text == "Entidad"
+        assert table.rows[0]._tr.trPr.find(qn("w:tblHeader")) is not None
+    assert doc.tables[2].rows[1].cells[0].text == "Entidad 4"
+
+
+def test_read_excel_data_returns_tuples_in_mapping_order(tmp_path):
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "ESP"
+    for row in range(1, 5):
+        ws.cell(row=row, column=2, value=f"Cargo {row}")
+        ws.cell(row=row, column=3, value=1234.5 * row).number_format = "#,##0.00"
+        ws.cell(row=row, column=4, value=f"Ministerio de Obras {row}, Perú")
+    path = tmp_path / "datos.xlsx"
+    wb.save(path)
+
+    mapping = [
+        {"header": "Monto", "source": "C", "format": "valor_tal_cual"},
+        {"header": "Vacía", "source": ""},
+        {"header": "No.", "source": "(auto-incremento)"},
+        {"header": "País", "source": "(extraer país)", "from_col": "D"},
+        {"header": "Cargo", "source": "B"},
+    ]
+    # Rows outside the sheet are dropped; numbering follows the requested list
+    assert read_excel_data(str(path), [2, 99, 4, 0], mapping) == [
+        ("2.469,00", "", "1", "Perú", "Cargo 2"),
+        ("4.938,00", "", "3", "Perú", "Cargo 4"),
+    ]
+
+
+@pytest.fixture
+def batch_dir(tmp_path):
+    template = Document()
+    template.add_paragraph("Antecedentes")
+    table = template.add_table(rows=1, cols=2)
+    table.rows[0].cells[0].text = "Entidad"
+    table.rows[0].cells[1].text = "Monto"
+    template.save(tmp_path / "modelo.docx")
+
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "ESP"
+    for row in range(1, 5):
+        ws.cell(row=row, column=1, value=f"Entidad {row}")
+        ws.cell(row=row, column=2, value=row * 1000)
+    wb.save(tmp_path / "datos.xlsx")
+    (tmp_path / "out").mkdir()
+    return tmp_path
+
+
+def _batch_jobs(folder):
+    mapping = [{"header": "Entidad", "source": "A"}, {"header": "Monto", "source": "B"}]
+    return [
+        {"template": str(folder / "modelo.docx"), "excel": str(folder / "datos.xlsx"), "rows": rows,
+         "mapping": mapping, "output": str(folder / "out" / name), "formats": ["csv"]}
+        for name, rows in (("A.docx", "1-2"), ("B.docx", "3-4"))
+    ]
+
+
+def test_run_batch_skips_unchanged_and_regenerates_edited_jobs(batch_dir):
+    manifest = str(batch_dir / "manifest.json")
+    jobs = _batch_jobs(batch_dir)
+    log = []
+    assert run_batch(jobs, manifest, log.append) == {"written": 2, "skipped": 0, "failed": 0}
+    assert sorted(p.name for p in (batch_dir / "out").iterdir()) == ["A.csv", "A.docx", "B.csv", "B.docx"]
+
+    assert run_batch(jobs, manifest, log.append) == {"written": 0, "skipped": 2, "failed": 0}
+
+    # Editing a source row only regenerates the job that reads it
+    wb = exp_table_generator.load_workbook(batch_dir / "datos.xlsx")
+    wb["ESP"]["A3"] = "Entidad editada"
+    wb.save(batch_dir / "datos.xlsx")
+    log.clear()
+    assert run_batch(jobs, manifest, log.append) == {"written": 1, "skipped": 1, "failed": 0}
+    assert log[0].startswith("Sin cambios:") and log[1].startswith("Generado:") and "B.docx" in log[1]
+    assert "Entidad editada" in (batch_dir / "out" / "B.csv").read_text(encoding="utf-8-sig")
+
+
+def test_run_batch_rebuilds_interrupted_outputs(batch_dir, monkeypatch):
+    manifest = str(batch_dir / "manifest.json")
+    jobs = _batch_jobs(batch_dir)
+    out = batch_dir / "out"
+    (out / ".A_2.docx.keep.tmp").write_text("")
+
+    # Kill the run while A is being written, leaving its temp files behind
+    def killed(data_rows, template_info, mapping, output_path, *args):
+        _temp_path(output_path)
+        _temp_path(str(out / "A.csv"))
+        raise KeyboardInterrupt
+
+    with monkeypatch.context() as m:
+        m.setattr(exp_table_generator, "generate_outputs", killed)
+        with pytest.raises(KeyboardInterrupt):
+            run_batch(jobs, manifest, lambda message: None)
+    entry = load_manifest(manifest)["outputs"][str((out / "A.docx").resolve())]
+    assert entry["state"] == "writing"
+    assert len([p for p in out.iterdir() if p.name.startswith(".A.")]) == 2
+
+    assert run_batch(jobs, manifest, lambda message: None) == {"written": 2, "skipped": 0, "failed": 0}
+    assert sorted(p.name for p in out.iterdir()) == [".A_2.docx.keep.tmp", "A.csv", "A.docx", "B.csv", "B.docx"]
+    assert all(e["state"] == "done" for e in load_manifest(manifest)["outputs"].values())